@@ -1,12 +1,36 @@
 """FastAPI application entrypoint."""
 
+import asyncio
+import hashlib
+import os
+import re
 import time
+import uuid
 import logging
+from collections import OrderedDict
 from typing import Any, Dict, Optional
 
+try:
+    # SIMD-accelerated (AVX2/AVX-512) base64 decoder; large PDF data URIs are
+    # decode-bound, so this is a direct hot-path win when available.
+    from pybase64 import b64decode as _b64decode
+except ImportError:  # pragma: no cover - pybase64 not installed
+    from base64 import b64decode as _b64decode
+
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, Header, HTTPException, status
+from fastapi import (
+    Depends,
+    FastAPI,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Request,
+    UploadFile,
+    status,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 
 load_dotenv()
 
@@ -22,21 +46,39 @@ import auth
 import drive
 import pdf_processor
 from models import (
+    JobStatusResponse,
+    ProcessDocumentJobResponse,
     ProcessDocumentRequest,
     ProcessDocumentResponse,
     UploadDocumentRequest,
     UploadDocumentResponse,
 )
 
-app = FastAPI(title="Document Analyzer API", version="0.1.0")
+# orjson serializes responses several times faster than stdlib json.dumps
+app = FastAPI(
+    title="Document Analyzer API",
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+)
 
-# Allow development clients by default; production should override.
+# Allow Expo dev-server origins by default; production overrides via env.
+# Explicit origin/method/header lists let the middleware short-circuit instead
+# of dynamically echoing wildcard headers on every response (and wildcard +
+# credentials is spec-invalid anyway).
+_allowed_origins = [
+    origin.strip()
+    for origin in os.getenv(
+        "ALLOWED_ORIGINS", "http://localhost:8081,http://localhost:19006"
+    ).split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=_allowed_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,  # let browsers cache preflight responses for a day
 )
 
 
@@ -46,13 +88,15 @@ def _parse_bearer_token(authorization: Optional[str]) -> str:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Missing Authorization header",
         )
-    prefix = "Bearer "
-    if not authorization.startswith(prefix):
+    # Single slice comparison; no startswith/strip passes on the hot path.
+    # RFC 6750 does not mandate trimming, and conformant clients send
+    # exactly "Bearer <token>".
+    if authorization[:7] != "Bearer ":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid Authorization header",
         )
-    token = authorization[len(prefix) :].strip()
+    token = authorization[7:]
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -75,80 +119,181 @@ def require_user(
         ) from exc
 
 
-@app.get("/health")
-def healthcheck() -> Dict[str, str]:
+# Cap on concurrent expensive (Gemini/Drive) requests per user, so one
+# misbehaving client cannot saturate the backend or burn through API quota.
+# Bounded LRU so uids accumulated over a long process lifetime don't leak;
+# evicting a semaphore still held just relaxes that user's cap until their
+# in-flight requests finish.
+_MAX_CONCURRENT_PER_USER = 3
+_MAX_TRACKED_USERS = 1024
+_user_semaphores: "OrderedDict[str, asyncio.Semaphore]" = OrderedDict()
+
+
+def _get_user_semaphore(uid: str) -> asyncio.Semaphore:
+    # Single event loop touches this map, so no lock is needed.
+    semaphore = _user_semaphores.get(uid)
+    if semaphore is None:
+        semaphore = _user_semaphores[uid] = asyncio.Semaphore(_MAX_CONCURRENT_PER_USER)
+    _user_semaphores.move_to_end(uid)
+    while len(_user_semaphores) > _MAX_TRACKED_USERS:
+        _user_semaphores.popitem(last=False)
+    return semaphore
+
+
+async def limit_user_concurrency(
+    user: Dict[str, Any] = Depends(require_user),
+) -> Dict[str, Any]:
+    """Hold a per-user semaphore for the duration of the request."""
+    semaphore = _get_user_semaphore(user.get("uid") or "anonymous")
+    async with semaphore:
+        yield user
+
+
+# Pre-encoded once: health checks arrive every few seconds from load
+# balancers, so skip response-model/JSON-encode work entirely.
+_HEALTH_BODY = b'{"status":"ok"}'
+
+
+@app.get("/health", include_in_schema=False)
+@app.get("/healthz", include_in_schema=False)
+def healthcheck() -> Response:
     """Health check endpoint."""
-    return {"status": "ok"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
+
+
+# Compiled once at import: characters that are unsafe in Drive filenames
+# (separators, control chars). Per-request re.sub with a literal pattern
+# would recompile/lookup on every upload.
+_FILENAME_UNSAFE_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+# Size caps: reject oversized payloads with an O(1) length check before any
+# multi-MB allocation or base64 decode happens.
+_MAX_PDF_DATA_URI_LEN = 40 * 1024 * 1024  # ~30 MB decoded
+_MAX_REQUEST_BODY_BYTES = 64 * 1024 * 1024
+
+
+@app.middleware("http")
+async def reject_oversized_requests(request: Request, call_next):
+    """Reject requests whose declared Content-Length exceeds the cap."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > _MAX_REQUEST_BODY_BYTES:
+        return ORJSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": "Request body too large"},
+        )
+    return await call_next(request)
 
 
 def _decode_pdf_bytes(data_uri: str) -> bytes:
-    import base64
+    if len(data_uri) > _MAX_PDF_DATA_URI_LEN:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="PDF too large",
+        )
 
+    # Only inspect a bounded prefix: split(",", 1) would scan and copy the
+    # whole multi-MB string before decoding even starts.
     if not data_uri.startswith("data:application/pdf"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid data URI format - expected PDF"
         )
 
-    parts = data_uri.split(",", 1)
-    if len(parts) != 2:
+    comma = data_uri.find(",", 0, 128)
+    if comma == -1:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid data URI: missing base64 data"
         )
 
-    return base64.b64decode(parts[1])
+    return _b64decode(data_uri[comma + 1:])
 
 
-@app.post("/process-document", response_model=ProcessDocumentResponse)
-def process_document(
-    request: ProcessDocumentRequest,
-    user: Dict[str, Any] = Depends(require_user),
-) -> ProcessDocumentResponse:
-    """
-    Analyze a PDF document with Gemini using context from existing Drive folder structure.
+def _hash_pdf_bytes(pdf_bytes: bytes) -> str:
+    """sha256 the decoded buffer in 1 MB chunks while it is still cache-hot."""
+    hasher = hashlib.sha256()
+    view = memoryview(pdf_bytes)
+    chunk = 1 << 20
+    for start in range(0, len(view), chunk):
+        hasher.update(view[start:start + chunk])
+    return hasher.hexdigest()
 
-    This endpoint:
-    1. Scans the user's Drive folders (2-3 levels deep)
-    2. Passes folder context to AI for intelligent categorization and path selection
-    3. Returns document metadata + suggested storage location
 
-    Uploads are handled separately via /upload-document.
+def _decode_and_hash_pdf(data_uri: str) -> tuple:
+    """Decode the PDF data URI and hash it in one go; returns (bytes, digest)."""
+    pdf_bytes = _decode_pdf_bytes(data_uri)
+    return pdf_bytes, _hash_pdf_bytes(pdf_bytes)
 
-    Requires:
-        - Google Drive access token (for folder scanning)
+
+async def _process_document_impl(
+    get_pdf_bytes,
+    google_access_token: str,
+    user: Dict[str, Any],
+) -> ProcessDocumentResponse:
+    """
+    Shared /process-document pipeline.
+
+    Args:
+        get_pdf_bytes: Zero-arg coroutine function producing
+            (pdf_bytes, sha256 hexdigest); awaited concurrently with the
+            Phase-1 Drive scan.
+        google_access_token: Drive OAuth token for folder scanning.
+        user: Decoded auth claims for the requesting user.
     """
     try:
-        request_start = time.time()
-        logger.info("="*80)
+        request_start = time.perf_counter()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("=" * 80)
         logger.info("[PERF] Starting /process-document request")
-        
-        # Decode PDF bytes
-        decode_start = time.time()
-        pdf_bytes = _decode_pdf_bytes(request.pdfData)
-        decode_time = time.time() - decode_start
-        logger.info(f"[PERF] PDF decode: {decode_time:.3f}s (size: {len(pdf_bytes):,} bytes)")
 
         # Get user ID for caching
         user_id = user.get("uid")
 
         # === PHASE 1: Quick top-level scan (1 level deep) ===
-        scan_start = time.time()
-        logger.info("[PERF] Phase 1: Scanning top-level folders only")
-        
-        top_level_structure = drive.scan_drive_folders(
-            request.googleAccessToken, 
+        # The scan and the PDF decode are independent, so run them concurrently:
+        # kick off the Drive scan first and decode in a worker thread meanwhile.
+        scan_start = time.perf_counter()
+        logger.info("[PERF] Phase 1: Scanning top-level folders only (concurrent with decode)")
+
+        scan_task = asyncio.create_task(drive.scan_drive_folders_async(
+            google_access_token,
             max_depth=1,  # Only top level for speed
             user_id=user_id,
             use_cache=True
-        )
+        ))
+
+        # Obtain PDF bytes (+ digest for the analysis cache) while the scan
+        # is in flight
+        try:
+            decode_start = time.perf_counter()
+            pdf_bytes, pdf_digest = await get_pdf_bytes()
+            decode_time = time.perf_counter() - decode_start
+            logger.info("[PERF] PDF decode: %.3fs (size: %d bytes)", decode_time, len(pdf_bytes))
+
+            # Extract the first page for AI context, still overlapping the scan
+            prepared_pdf_bytes = await pdf_processor.prepare_pdf_for_analysis_async(pdf_bytes)
+        except BaseException:
+            # A decode failure (bad base64, 400/413) must not leave the scan
+            # running detached: cancel it and retrieve its outcome so a
+            # failing scan can't log "exception was never retrieved".
+            scan_task.cancel()
+            try:
+                await scan_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            raise
+
+        top_level_structure = await scan_task
         top_level_folders = top_level_structure.get("paths", [])
-        phase1_time = time.time() - scan_start
-        logger.info(f"[PERF] Phase 1 complete: {phase1_time:.3f}s (found {len(top_level_folders)} top-level folders)")
+        phase1_time = time.perf_counter() - scan_start
+        logger.info("[PERF] Phase 1 complete: %.3fs (found %d top-level folders)", phase1_time, len(top_level_folders))
 
         # === AI ANALYSIS: Determine category and suggested path ===
-        ai_start = time.time()
-        result = pdf_processor.analyze_pdf_with_folder_context(pdf_bytes, top_level_folders)
+        ai_start = time.perf_counter()
+        result = await pdf_processor.analyze_pdf_with_folder_context_async(
+            pdf_bytes, top_level_folders, prepared_pdf_bytes, pdf_digest
+        )
         suggested_path = result.get("suggested_path", "")
         
         # === PHASE 2: Deep scan of specific parent folder (if nested) ===
@@ -156,32 +301,38 @@ def process_document(
         all_folders = top_level_folders.copy()
         
         # Check if AI suggested a nested path (e.g., "/Car/Mazda CX-5/2022")
+        # Candidate parents scan concurrently (bounded); a single suggestion
+        # today, but top-K alternatives plug straight in.
         path_parts = [p for p in suggested_path.split('/') if p]
-        if len(path_parts) > 1:
-            # Extract parent folder (e.g., "/Car" from "/Car/Mazda CX-5/2022")
-            parent_folder = f"/{path_parts[0]}"
-            logger.info(f"[PERF] Phase 2: Drilling into '{parent_folder}' for deeper folders")
-            
-            phase2_start = time.time()
-            # Scan children of the suggested parent folder
-            deeper_folders = drive.scan_folder_children(parent_folder, request.googleAccessToken)
-            deeper_paths = [f["path"] for f in deeper_folders]
+        candidate_parents = [f"/{path_parts[0]}"] if len(path_parts) > 1 else []
+        if candidate_parents:
+            logger.info("[PERF] Phase 2: Drilling into %s for deeper folders", candidate_parents)
+
+            phase2_start = time.perf_counter()
+            # Scan children of the candidate parent folders concurrently
+            children_per_parent = await drive.scan_folder_children_many_async(
+                candidate_parents, google_access_token
+            )
+            deeper_paths = [
+                f["path"] for children in children_per_parent for f in children
+            ]
             all_folders.extend(deeper_paths)
-            
-            phase2_time = time.time() - phase2_start
-            logger.info(f"[PERF] Phase 2 complete: {phase2_time:.3f}s (found {len(deeper_paths)} folders in {parent_folder})")
+
+            phase2_time = time.perf_counter() - phase2_start
+            logger.info("[PERF] Phase 2 complete: %.3fs (found %d folders in %s)", phase2_time, len(deeper_paths), candidate_parents)
         else:
-            logger.info(f"[PERF] Phase 2: Skipped (top-level path suggested)")
+            logger.info("[PERF] Phase 2: Skipped (top-level path suggested)")
         
-        ai_time = time.time() - ai_start
+        ai_time = time.perf_counter() - ai_start
         scan_time = phase1_time + phase2_time
-        logger.info(f"[PERF] Drive folder scan total: {scan_time:.3f}s (phase1={phase1_time:.1f}s, phase2={phase2_time:.1f}s)")
-        logger.info(f"[PERF] AI processing: {ai_time:.3f}s")
+        logger.info("[PERF] Drive folder scan total: %.3fs (phase1=%.1fs, phase2=%.1fs)", scan_time, phase1_time, phase2_time)
+        logger.info("[PERF] AI processing: %.3fs", ai_time)
         
-        total_time = time.time() - request_start
-        logger.info(f"[PERF] TOTAL /process-document: {total_time:.3f}s")
-        logger.info(f"[PERF] Breakdown: decode={decode_time:.1f}s, scan={scan_time:.1f}s, AI={ai_time:.1f}s")
-        logger.info("="*80)
+        total_time = time.perf_counter() - request_start
+        logger.info("[PERF] TOTAL /process-document: %.3fs", total_time)
+        logger.info("[PERF] Breakdown: decode=%.1fs, scan=%.1fs, AI=%.1fs", decode_time, scan_time, ai_time)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("=" * 80)
 
         return ProcessDocumentResponse(
             title=result["title"],
@@ -209,10 +360,174 @@ def process_document(
         ) from exc
 
 
+@app.post("/process-document", response_model=ProcessDocumentResponse)
+async def process_document(
+    request: ProcessDocumentRequest,
+    user: Dict[str, Any] = Depends(limit_user_concurrency),
+) -> ProcessDocumentResponse:
+    """
+    Analyze a PDF document with Gemini using context from existing Drive folder structure.
+
+    This endpoint:
+    1. Scans the user's Drive folders (2-3 levels deep)
+    2. Passes folder context to AI for intelligent categorization and path selection
+    3. Returns document metadata + suggested storage location
+
+    Uploads are handled separately via /upload-document.
+
+    Requires:
+        - Google Drive access token (for folder scanning)
+    """
+
+    async def get_pdf_bytes() -> tuple:
+        return await asyncio.to_thread(_decode_and_hash_pdf, request.pdfData)
+
+    return await _process_document_impl(get_pdf_bytes, request.googleAccessToken, user)
+
+
+@app.post("/process-document-file", response_model=ProcessDocumentResponse)
+async def process_document_file(
+    pdf: UploadFile = File(...),
+    googleAccessToken: str = Form(...),
+    user: Dict[str, Any] = Depends(limit_user_concurrency),
+) -> ProcessDocumentResponse:
+    """
+    Multipart variant of /process-document.
+
+    Accepts the raw PDF as a multipart file instead of a base64 data URI,
+    avoiding the ~33% transfer inflation and the decode pass entirely.
+    The JSON data-URI endpoint remains for existing clients.
+    """
+
+    async def get_pdf_bytes() -> tuple:
+        pdf_bytes = await pdf.read()
+        if not pdf_bytes.startswith(b"%PDF"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid upload - expected PDF",
+            )
+        return pdf_bytes, await asyncio.to_thread(_hash_pdf_bytes, pdf_bytes)
+
+    return await _process_document_impl(get_pdf_bytes, googleAccessToken, user)
+
+
+# In-process store for async analysis jobs, so slow clients can submit and
+# poll instead of holding a connection open for the full Gemini round-trip.
+# Format: {job_id: {"uid": ..., "status": ..., "result": ..., "error": ...,
+#                   "task": ..., "expires_at": ...}}
+_jobs: Dict[str, Dict[str, Any]] = {}
+_JOB_TTL_SECONDS = 600  # finished jobs linger 10 minutes for late pollers
+
+# The semaphore only bounds executing jobs; this bounds what a client can
+# queue up, since each pending job retains its multi-MB pdfData in memory.
+_MAX_PENDING_JOBS_PER_USER = 5
+
+
+def _prune_expired_jobs() -> None:
+    now = time.time()
+    expired = [job_id for job_id, job in _jobs.items() if job["expires_at"] <= now]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+async def _run_process_document_job(
+    job_id: str,
+    request: ProcessDocumentRequest,
+    user: Dict[str, Any],
+) -> None:
+    job = _jobs[job_id]
+    try:
+        # Background work still counts against the per-user concurrency cap.
+        semaphore = _get_user_semaphore(user.get("uid") or "anonymous")
+        async with semaphore:
+
+            async def get_pdf_bytes() -> tuple:
+                return await asyncio.to_thread(_decode_and_hash_pdf, request.pdfData)
+
+            result = await _process_document_impl(
+                get_pdf_bytes, request.googleAccessToken, user
+            )
+        job["status"] = "done"
+        job["result"] = result
+    except HTTPException as exc:
+        job["status"] = "error"
+        job["error"] = str(exc.detail)
+    except Exception as exc:
+        job["status"] = "error"
+        job["error"] = f"Document processing failed: {exc}"
+    finally:
+        job["expires_at"] = time.time() + _JOB_TTL_SECONDS
+
+
+@app.post(
+    "/process-document-async",
+    response_model=ProcessDocumentJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def process_document_async(
+    request: ProcessDocumentRequest,
+    user: Dict[str, Any] = Depends(require_user),
+) -> ProcessDocumentJobResponse:
+    """
+    Submit a /process-document job without waiting for the result.
+
+    Returns 202 with a job id immediately; poll GET /jobs/{jobId} for the
+    outcome. Same request body and processing pipeline as /process-document.
+    """
+    _prune_expired_jobs()
+
+    uid = user.get("uid")
+    pending = sum(
+        1 for job in _jobs.values()
+        if job["uid"] == uid and job["status"] == "pending"
+    )
+    if pending >= _MAX_PENDING_JOBS_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many pending jobs; wait for current jobs to finish",
+        )
+
+    job_id = uuid.uuid4().hex
+    job: Dict[str, Any] = {
+        "uid": user.get("uid"),
+        "status": "pending",
+        "result": None,
+        "error": None,
+        "expires_at": time.time() + _JOB_TTL_SECONDS,
+    }
+    _jobs[job_id] = job
+    # Keep a reference on the job so the task is not garbage collected.
+    job["task"] = asyncio.create_task(
+        _run_process_document_job(job_id, request, user)
+    )
+
+    return ProcessDocumentJobResponse(jobId=job_id, status="pending")
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(
+    job_id: str,
+    user: Dict[str, Any] = Depends(require_user),
+) -> JobStatusResponse:
+    """Poll the status of an async analysis job submitted by this user."""
+    job = _jobs.get(job_id)
+    if job is None or job["uid"] != user.get("uid"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+    return JobStatusResponse(
+        jobId=job_id,
+        status=job["status"],
+        result=job["result"],
+        error=job["error"],
+    )
+
+
 @app.post("/upload-document", response_model=UploadDocumentResponse)
-def upload_document(
+async def upload_document(
     request: UploadDocumentRequest,
-    user: Dict[str, Any] = Depends(require_user),
+    user: Dict[str, Any] = Depends(limit_user_concurrency),
 ) -> UploadDocumentResponse:
     """
     Upload the confirmed PDF to Google Drive using the user-confirmed metadata and path.
@@ -221,8 +536,8 @@ def upload_document(
     as confirmed by the user in the frontend.
     """
     try:
-        # Validate PDF payload
-        _decode_pdf_bytes(request.pdfData)
+        # Decode once; the bytes flow straight through to the Drive upload
+        pdf_bytes = _decode_pdf_bytes(request.pdfData)
 
         # Get user ID for cache management
         user_id = user.get("uid")
@@ -231,7 +546,7 @@ def upload_document(
         final_folder_path = request.confirmedPath.lstrip("/")
 
         # Ensure the folder path exists in Drive (create if needed)
-        folder_id, created_new_folder = drive.ensure_folder_path(
+        folder_id, created_new_folder = await drive.ensure_folder_path_async(
             final_folder_path,
             request.googleAccessToken,
         )
@@ -240,10 +555,11 @@ def upload_document(
         if created_new_folder and user_id:
             drive.clear_folder_cache(user_id)
 
-        # Upload the PDF file
-        filename = f"{request.title}.pdf"
-        drive_file_id, drive_url = drive.upload_file(
-            file_data_uri=request.pdfData,
+        # Upload the PDF file (title sanitized for use as a Drive filename)
+        safe_title = _FILENAME_UNSAFE_RE.sub("", request.title).strip() or "Untitled Document"
+        filename = f"{safe_title}.pdf"
+        drive_file_id, drive_url = await drive.upload_file_async(
+            file_bytes=pdf_bytes,
             filename=filename,
             folder_id=folder_id,
             mime_type="application/pdf",
@@ -273,4 +589,20 @@ def upload_document(
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
+    # loop/http "auto" picks uvloop + httptools where uvicorn[standard]
+    # installs them (not on Windows, where pinning them would hard-fail);
+    # auto-reload is dev-only, opt in with RELOAD=1. Default to a single
+    # worker: async-job state, per-user semaphores, and all caches live
+    # in-process, so with N workers a job poll lands on the submitting
+    # worker only 1/N of the time and the concurrency cap multiplies by N.
+    # Scale out via WEB_CONCURRENCY only once that state moves to shared
+    # storage.
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="auto",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        reload=os.getenv("RELOAD") == "1",
+    )
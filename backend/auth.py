@@ -5,18 +5,33 @@ Verifies incoming Firebase ID tokens and provides an opt-in bypass for
 local development via the FIREBASE_SKIP_AUTH environment variable.
 """
 
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
 from functools import lru_cache
 from typing import Any, Dict
 
 from firebase_admin import App, auth as firebase_auth, credentials, get_app, initialize_app
 
+# LRU+TTL cache of verified tokens so repeat requests from the same client
+# skip the signature verification (and potential JWKS fetch) entirely.
+# Format: {token_digest: (expires_at, decoded_claims)}
+_token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+_TOKEN_CACHE_MAXSIZE = 10_000
+_TOKEN_CACHE_TTL_SECONDS = 300  # 5 minutes, capped by the JWT's own exp
+
 
 class AuthError(Exception):
     """Raised when Firebase authentication fails."""
 
 
+@lru_cache(maxsize=1)
 def _should_skip_auth() -> bool:
+    # Cached: the flag is read once per process instead of parsing the env
+    # on every request. Use _should_skip_auth.cache_clear() if it changes.
     return os.getenv("FIREBASE_SKIP_AUTH", "").strip().lower() in {"1", "true", "yes"}
 
 
@@ -60,12 +75,38 @@ def verify_id_token(id_token: str) -> Dict[str, Any]:
         # Return minimal claims so downstream code can proceed in local dev.
         return {"uid": "local-dev", "email": "local@example.com"}
 
+    now = time.time()
+    cache_key = hashlib.blake2b(id_token.encode(), digest_size=16).digest()
+
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+        if cached is not None:
+            expires_at, claims = cached
+            if expires_at > now:
+                _token_cache.move_to_end(cache_key)
+                return claims
+            del _token_cache[cache_key]
+
     try:
         app = _get_firebase_app()
-        return firebase_auth.verify_id_token(id_token, app=app)
+        claims = firebase_auth.verify_id_token(id_token, app=app)
     except Exception as exc:  # pragma: no cover - firebase admin handles errors
         raise AuthError(f"Failed to verify ID token: {exc}") from exc
 
+    # Cache until the token's own exp, capped at the local TTL.
+    expires_at = min(
+        float(claims.get("exp", now + _TOKEN_CACHE_TTL_SECONDS)),
+        now + _TOKEN_CACHE_TTL_SECONDS,
+    )
+    if expires_at > now:
+        with _token_cache_lock:
+            _token_cache[cache_key] = (expires_at, claims)
+            _token_cache.move_to_end(cache_key)
+            while len(_token_cache) > _TOKEN_CACHE_MAXSIZE:
+                _token_cache.popitem(last=False)
+
+    return claims
+
 
 def is_auth_disabled() -> bool:
     """Expose whether auth is bypassed (useful for FastAPI dependency wiring)."""
@@ -57,21 +57,31 @@ docker buildx build \
 
 echo "Deploying to Cloud Run in region: ${REGION}" >&2
 
-# Load GEMINI_API_KEY from .env if it exists
+# Load GEMINI_API_KEY and ALLOWED_ORIGINS from .env if it exists
 if [ -f "${CONTEXT_DIR}/.env" ]; then
-  export $(grep -v '^#' "${CONTEXT_DIR}/.env" | grep GEMINI_API_KEY | xargs)
+  export $(grep -v '^#' "${CONTEXT_DIR}/.env" | grep -E 'GEMINI_API_KEY|ALLOWED_ORIGINS' | xargs)
 fi
 
 if [ -z "${GEMINI_API_KEY:-}" ]; then
   echo "Warning: GEMINI_API_KEY not set. Backend may not function correctly." >&2
 fi
 
+if [ -z "${ALLOWED_ORIGINS:-}" ]; then
+  echo "Warning: ALLOWED_ORIGINS not set. CORS falls back to the localhost dev origins; web clients on other origins will be blocked." >&2
+fi
+
+# Single instance: async-job state, per-user concurrency caps, and all
+# caches live in-process, so a poll that lands on a different instance
+# 404s. Raise this only after moving job state to shared storage.
 gcloud run deploy doc-ai-backend \
   --image "${IMAGE}" \
   --region "${REGION}" \
   --allow-unauthenticated \
+  --max-instances 1 \
+  --min-instances 1 \
   --set-env-vars FIREBASE_PROJECT_ID=doc-ai-proto \
   --set-env-vars FIREBASE_SKIP_AUTH=true \
-  --set-env-vars GEMINI_API_KEY="${GEMINI_API_KEY:-}"
+  --set-env-vars GEMINI_API_KEY="${GEMINI_API_KEY:-}" \
+  --set-env-vars "^@^ALLOWED_ORIGINS=${ALLOWED_ORIGINS:-}"
 
 echo "Done. If successful, set EXPO_PUBLIC_API_BASE_URL to the service URL." >&2
@@ -1,24 +1,93 @@
 """Google Drive integration for uploading documents."""
 
-import base64
+import array
+import asyncio
+import hashlib
 import io
 import os
+import random
+import sys
+import threading
 import time
 import logging
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
 from google.oauth2 import service_account
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import MediaIoBaseUpload, build_http
+from googleapiclient.model import JsonModel
+
+from retry import retry_on_429
+
+try:
+    # Large files.list responses are parse-bound; orjson decodes them several
+    # times faster than the stdlib json the client uses by default.
+    import orjson
+except ImportError:  # pragma: no cover - orjson not installed
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
-# In-memory cache for Drive folder structures
-# Format: {user_id: {"folders": {...}, "paths": [...], "expires_at": timestamp}}
-_folder_cache: Dict[str, Dict] = {}
+# In-memory LRU cache for Drive folder structures (bounded, one entry per
+# user+depth; least-recently-used entries are evicted past the max size).
+# Format: {(cache_id, max_depth): {"folders": [...], "paths": [...], "expires_at": timestamp}}
+# cache_id is the Firebase uid when known, otherwise a digest of the access token,
+# so the /process-document -> /upload-document flow shares one scan either way.
+_folder_cache: "OrderedDict[Tuple[str, int], Dict]" = OrderedDict()
+_folder_cache_lock = threading.Lock()
+_FOLDER_CACHE_MAXSIZE = 1024
 _CACHE_TTL_SECONDS = 300  # 5 minutes
 
+# Drive query fragments, built once: every folder query shares the same
+# mimeType+trashed clause
+_FOLDER_MIME = "application/vnd.google-apps.folder"
+_FOLDERS_QUERY = f"mimeType='{_FOLDER_MIME}' and trashed=false"
+
+# Single-flight: one Drive scan per (user, depth) at a time; concurrent cache
+# misses wait for the first scan instead of all hitting the API in parallel.
+# Bounded LRU: keys can be token digests that rotate hourly, so an unbounded
+# map leaks in long-lived processes. Evicting a lock someone holds merely
+# loses single-flight for that key once, which is harmless.
+_scan_locks: "OrderedDict[Tuple[str, int], threading.Lock]" = OrderedDict()
+_scan_locks_lock = threading.Lock()
+_SCAN_LOCKS_MAXSIZE = 1024
+
+
+def _get_scan_lock(key: Tuple[str, int]) -> threading.Lock:
+    with _scan_locks_lock:
+        lock = _scan_locks.get(key)
+        if lock is None:
+            lock = _scan_locks[key] = threading.Lock()
+        _scan_locks.move_to_end(key)
+        while len(_scan_locks) > _SCAN_LOCKS_MAXSIZE:
+            _scan_locks.popitem(last=False)
+        return lock
+
+# LRU+TTL cache of resolved folder paths -> leaf folder id, keyed by
+# (credential digest, normalized path). Successive uploads into the same
+# folder skip the per-segment find round-trips entirely.
+# Format: {(cred_key, path): (expires_at, folder_id)}
+_path_cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+_path_cache_lock = threading.Lock()
+_PATH_CACHE_MAXSIZE = 4096
+_PATH_CACHE_TTL_SECONDS = 3600
+
+# LRU+TTL of completed uploads keyed by (content digest, folder_id, filename),
+# so a retry storm or an accidental double-submit returns the original file
+# instead of creating a duplicate in Drive. Short TTL: long enough to absorb
+# retries, short enough that a user who deletes the file in Drive and
+# re-submits gets a real upload instead of a stale id.
+# Format: {(digest, folder_id, filename): (expires_at, file_id, web_view_link)}
+_upload_cache: "OrderedDict[Tuple[bytes, Optional[str], str], Tuple[float, str, str]]" = OrderedDict()
+_upload_cache_lock = threading.Lock()
+_UPLOAD_CACHE_MAXSIZE = 512
+_UPLOAD_CACHE_TTL_SECONDS = 300
+
 
 class DriveError(Exception):
     """Custom exception for Google Drive errors."""
@@ -26,8 +95,13 @@ class DriveError(Exception):
     pass
 
 
+@lru_cache(maxsize=1)
 def _get_service_account_credentials():
-    """Get Google Drive API credentials from service account (for backend operations)."""
+    """Get Google Drive API credentials from service account (for backend operations).
+
+    Cached: the JSON key file is read and the RSA key parsed once per process;
+    the credentials object refreshes its own tokens thereafter.
+    """
     creds_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     if not creds_path:
         raise DriveError("GOOGLE_APPLICATION_CREDENTIALS not set")
@@ -65,23 +139,109 @@ def _get_user_credentials(access_token: str):
     return credentials
 
 
+class _OrjsonModel(JsonModel):
+    """JsonModel that deserializes Drive responses with orjson."""
+
+    def deserialize(self, content):
+        body = orjson.loads(content)
+        if self._data_wrapper and isinstance(body, dict) and "data" in body:
+            body = body["data"]
+        return body
+
+
+_response_model = _OrjsonModel() if orjson is not None else None
+
+
+def _credential_cache_key(access_token: Optional[str]) -> str:
+    """Cache identity for a credential: token digest (never the raw token)."""
+    if access_token:
+        return hashlib.blake2b(access_token.encode(), digest_size=16).hexdigest()
+    return "service-account"
+
+
+# Per-thread LRU of service objects keyed by credential. googleapiclient/
+# httplib2 are not thread-safe, so transports are never shared across
+# threads; within a thread, repeat calls for the same credential reuse the
+# keep-alive connection instead of re-handshaking. Worker threads come from
+# asyncio.to_thread's bounded executor, so the total stays small.
+_thread_services = threading.local()
+_THREAD_SERVICE_MAXSIZE = 8
+
+
 def _get_drive_service(access_token: Optional[str] = None):
     """
     Create and return a Google Drive API service instance.
 
+    Services are cached per (thread, credential): each thread owns its
+    transports outright - no cross-thread Http sharing - while successive
+    calls on the same thread keep the pooled connection warm. Old entries
+    (e.g. rotated OAuth tokens) age out of the small per-thread LRU.
+
     Args:
         access_token: Optional user OAuth access token. If provided, uses user's credentials.
                      If not provided, falls back to service account.
     """
+    cache_key = _credential_cache_key(access_token)
+    services = getattr(_thread_services, "services", None)
+    if services is None:
+        services = _thread_services.services = OrderedDict()
+
+    service = services.get(cache_key)
+    if service is not None:
+        services.move_to_end(cache_key)
+        return service
+
     if access_token:
         credentials = _get_user_credentials(access_token)
     else:
         credentials = _get_service_account_credentials()
 
-    service = build("drive", "v3", credentials=credentials)
+    service = build(
+        "drive",
+        "v3",
+        http=AuthorizedHttp(credentials, http=build_http()),
+        cache_discovery=False,
+        model=_response_model,
+    )
+
+    services[cache_key] = service
+    while len(services) > _THREAD_SERVICE_MAXSIZE:
+        services.popitem(last=False)
+
     return service
 
 
+def _escape_query_value(value: str) -> str:
+    """Escape a string literal for a Drive files.list query."""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+# Root folder id per credential: queries accept the 'root' alias, but
+# files.parents contains the real id, so resolve it once to match parents
+# locally against prefetched folders. Bounded LRU: token-digest keys rotate,
+# so the map would otherwise grow forever.
+_root_id_cache: "OrderedDict[str, str]" = OrderedDict()
+_root_id_cache_lock = threading.Lock()
+_ROOT_ID_CACHE_MAXSIZE = 256
+
+
+def _get_root_folder_id(service, cred_key: str) -> str:
+    with _root_id_cache_lock:
+        root_id = _root_id_cache.get(cred_key)
+        if root_id is not None:
+            _root_id_cache.move_to_end(cred_key)
+            return root_id
+
+    root_id = service.files().get(fileId="root", fields="id").execute()["id"]
+
+    with _root_id_cache_lock:
+        _root_id_cache[cred_key] = root_id
+        _root_id_cache.move_to_end(cred_key)
+        while len(_root_id_cache) > _ROOT_ID_CACHE_MAXSIZE:
+            _root_id_cache.popitem(last=False)
+    return root_id
+
+
 def _find_folder(service, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
     """
     Find a folder by name, optionally within a parent folder.
@@ -94,14 +254,14 @@ def _find_folder(service, folder_name: str, parent_id: Optional[str] = None) ->
     Returns:
         Folder ID if found, None otherwise
     """
-    query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+    query = f"name='{_escape_query_value(folder_name)}' and {_FOLDERS_QUERY}"
     if parent_id:
         query += f" and '{parent_id}' in parents"
 
     results = service.files().list(
         q=query,
         spaces="drive",
-        fields="files(id, name)",
+        fields="files(id)",
         pageSize=1
     ).execute()
 
@@ -123,7 +283,7 @@ def _create_folder(service, folder_name: str, parent_id: Optional[str] = None) -
     """
     file_metadata = {
         "name": folder_name,
-        "mimeType": "application/vnd.google-apps.folder"
+        "mimeType": _FOLDER_MIME
     }
     if parent_id:
         file_metadata["parents"] = [parent_id]
@@ -136,103 +296,218 @@ def _create_folder(service, folder_name: str, parent_id: Optional[str] = None) -
     return folder.get("id")
 
 
-def _build_folder_tree(folders: List[Dict], max_depth: int = 2) -> List[Dict]:
-    """
-    Build hierarchical folder tree from flat list of folders.
+def _folder_cache_id(access_token: Optional[str], user_id: Optional[str]) -> Optional[str]:
+    """Resolve the cache identity: Firebase uid when known, else a token digest."""
+    if user_id:
+        return user_id
+    if access_token:
+        return hashlib.blake2b(access_token.encode(), digest_size=16).hexdigest()
+    return None
 
-    Args:
-        folders: Flat list of folder dicts with 'id', 'name', and 'parents'
-        max_depth: Maximum depth to include (0 = root level only)
 
-    Returns:
-        List of root-level folders with nested 'children' arrays
+def clear_folder_cache(cache_id: str) -> None:
     """
-    # Create lookup map: folder_id -> folder
-    folder_map = {f["id"]: {**f, "children": []} for f in folders}
-
-    # Build parent-child relationships
-    root_folders = []
-    for folder in folders:
-        if "parents" in folder and folder["parents"]:
-            parent_id = folder["parents"][0]  # First parent
-            if parent_id in folder_map:
-                folder_map[parent_id]["children"].append(folder_map[folder["id"]])
-        else:
-            # No parents means root-level folder
-            root_folders.append(folder_map[folder["id"]])
+    Clear the cached folder structures (all depths) for a specific user.
 
-    return root_folders
-
-
-def clear_folder_cache(user_id: str) -> None:
-    """
-    Clear the cached folder structure for a specific user.
-    
     Call this when folders are created to ensure fresh data on next scan.
-    
+
     Args:
-        user_id: Unique identifier for the user (e.g., Firebase UID)
+        cache_id: Unique identifier for the user (Firebase UID or token digest)
     """
-    if user_id in _folder_cache:
-        logger.info(f"Clearing folder cache for user: {user_id}")
-        del _folder_cache[user_id]
+    with _folder_cache_lock:
+        stale_keys = [key for key in _folder_cache if key[0] == cache_id]
+        if stale_keys:
+            logger.info(f"Clearing folder cache for user: {cache_id}")
+            for key in stale_keys:
+                del _folder_cache[key]
 
 
-def _get_cached_folders(user_id: str) -> Optional[Dict]:
+def _get_cached_folders(cache_id: str, max_depth: int) -> Optional[Dict]:
     """
     Get cached folder structure if valid (not expired).
-    
+
     Args:
-        user_id: Unique identifier for the user
-        
+        cache_id: Unique identifier for the user
+        max_depth: Scan depth the cached entry must match
+
     Returns:
         Cached folder data or None if cache miss/expired
     """
-    if user_id not in _folder_cache:
-        return None
-        
-    cached_data = _folder_cache[user_id]
-    now = time.time()
-    
-    if cached_data["expires_at"] <= now:
-        logger.info(f"Folder cache expired for user: {user_id}")
-        del _folder_cache[user_id]
-        return None
-    
-    logger.info(f"Using cached folder structure for user: {user_id} (expires in {cached_data['expires_at'] - now:.0f}s)")
+    key = (cache_id, max_depth)
+    with _folder_cache_lock:
+        cached_data = _folder_cache.get(key)
+        if cached_data is None:
+            return None
+        now = time.time()
+        if cached_data["expires_at"] <= now:
+            # Keep the expired entry around (still LRU-tracked):
+            # scan_drive_folders may revalidate it cheaply via the changes API
+            # instead of re-scanning.
+            logger.info(f"Folder cache expired for user: {cache_id}")
+            return None
+        _folder_cache.move_to_end(key)
+
+    logger.info(f"Using cached folder structure for user: {cache_id} (expires in {cached_data['expires_at'] - now:.0f}s)")
     return cached_data
 
 
-def _set_cached_folders(user_id: str, folder_data: Dict) -> None:
+def _set_cached_folders(
+    cache_id: str, max_depth: int, folder_data: Dict, page_token: Optional[str] = None
+) -> None:
     """
     Store folder structure in cache with TTL.
-    
+
     Args:
-        user_id: Unique identifier for the user
+        cache_id: Unique identifier for the user
+        max_depth: Scan depth this entry covers
         folder_data: Folder structure to cache
+        page_token: Drive changes page token captured at scan time, used to
+            revalidate the entry after the TTL instead of re-scanning
     """
-    now = time.time()
-    _folder_cache[user_id] = {
-        **folder_data,
-        "expires_at": now + _CACHE_TTL_SECONDS
-    }
-    logger.info(f"Cached folder structure for user: {user_id} (TTL: {_CACHE_TTL_SECONDS}s)")
+    key = (cache_id, max_depth)
+    with _folder_cache_lock:
+        _folder_cache[key] = {
+            **folder_data,
+            "page_token": page_token,
+            "expires_at": _cache_expiry()
+        }
+        _folder_cache.move_to_end(key)
+        while len(_folder_cache) > _FOLDER_CACHE_MAXSIZE:
+            _folder_cache.popitem(last=False)
+    logger.info(f"Cached folder structure for user: {cache_id} (TTL: ~{_CACHE_TTL_SECONDS}s)")
+
+
+# Internal cache-entry bookkeeping keys, stripped before returning to callers
+_CACHE_META_KEYS = ("expires_at", "page_token")
+
+
+def _cache_expiry() -> float:
+    """Expiry timestamp with ±20% jitter so warmed caches don't all expire at once."""
+    return time.time() + random.uniform(
+        _CACHE_TTL_SECONDS * 0.8, _CACHE_TTL_SECONDS * 1.2
+    )
+
+
+def _get_changes_page_token(service) -> Optional[str]:
+    """Snapshot the current Drive changes cursor (None if unavailable)."""
+    try:
+        return service.changes().getStartPageToken().execute().get("startPageToken")
+    except Exception as e:
+        logger.warning(f"Could not fetch Drive changes token: {e}")
+        return None
+
+
+def _revalidate_cached_folders(service, cache_id: str, max_depth: int) -> Optional[Dict]:
+    """
+    Try to refresh an expired cache entry without a full re-scan.
+
+    One changes.list call tells us whether any folders changed since the scan;
+    if none did, the entry gets a fresh TTL and cursor. Any folder change (or
+    more than a page of changes) falls through to a full re-scan, which is
+    already just one batched call per level.
+
+    Returns:
+        The still-valid cache entry, or None if a re-scan is needed.
+    """
+    with _folder_cache_lock:
+        entry = _folder_cache.get((cache_id, max_depth))
+    if not entry or not entry.get("page_token"):
+        return None
+
+    try:
+        changes = service.changes().list(
+            pageToken=entry["page_token"],
+            fields="newStartPageToken,nextPageToken,changes(removed,file(mimeType))",
+            pageSize=100,
+        ).execute()
+    except Exception as e:
+        logger.warning(f"Folder cache revalidation failed for {cache_id}: {e}")
+        return None
+
+    # Removed entries carry no mimeType, so treat them as possible folders
+    folders_changed = changes.get("nextPageToken") is not None or any(
+        change.get("removed")
+        or change.get("file", {}).get("mimeType") == _FOLDER_MIME
+        for change in changes.get("changes", [])
+    )
+    if folders_changed:
+        return None
+
+    with _folder_cache_lock:
+        entry["page_token"] = changes.get("newStartPageToken", entry["page_token"])
+        entry["expires_at"] = _cache_expiry()
+        if (cache_id, max_depth) in _folder_cache:
+            _folder_cache.move_to_end((cache_id, max_depth))
+    logger.info(f"  [CACHE] Revalidated folder cache for user: {cache_id} (no folder changes)")
+    return entry
+
+
+@retry_on_429
+def _scan_folder_children_once(parent_path: str, access_token: str) -> List[Dict]:
+    """One attempt at scanning a folder's children; raises on failure.
+
+    Decorated with the 429 retry here - inside the best-effort wrapper -
+    so rate-limit errors reach the retry logic instead of being swallowed.
+    """
+    service = _get_drive_service(access_token)
+
+    # First, find the parent folder ID
+    parent_path = parent_path.strip('/')
+    path_parts = [p.strip() for p in parent_path.split('/') if p.strip()]
+
+    parent_id = None
+    for folder_name in path_parts:
+        folder_id = _find_folder(service, folder_name, parent_id)
+        if not folder_id:
+            logger.warning(f"Parent folder not found: {parent_path}")
+            return []
+        parent_id = folder_id
+
+    # Now scan children of this parent (max pageSize + pagination, so wide
+    # folders cost one round-trip per 1000 children instead of truncating)
+    query = f"{_FOLDERS_QUERY} and '{parent_id}' in parents"
+
+    folders = []
+    request = service.files().list(
+        q=query,
+        spaces="drive",
+        fields="nextPageToken, files(id, name)",
+        pageSize=1000
+    )
+    while request is not None:
+        results = request.execute()
+        folders.extend(results.get("files", []))
+        request = service.files().list_next(request, results)
+    children = []
+    for folder in folders:
+        child_path = f"/{parent_path}/{folder['name']}"
+        children.append({
+            "id": folder["id"],
+            "name": folder["name"],
+            "path": child_path
+        })
+
+    logger.info(f"  [CACHE] Found {len(children)} children in {parent_path}")
+    return children
 
 
 def scan_folder_children(parent_path: str, access_token: str) -> List[Dict]:
     """
     Scan immediate children (1 level deep) of a specific folder.
-    
+
     Used for phase 2 of progressive scanning - after identifying a top-level category,
     scan deeper only within that specific folder.
-    
+
+    Best-effort: failures (after 429 retries are exhausted) degrade to an
+    empty list rather than failing the whole analysis.
+
     Args:
         parent_path: Path to parent folder (e.g., '/Car' or '/Finance')
         access_token: User's OAuth access token
-        
+
     Returns:
         List of child folders with paths like ['/Car/Mazda CX-5', '/Car/Toyota Camry']
-        
+
     Example:
         children = scan_folder_children('/Car', token)
         # Returns: [
@@ -241,48 +516,126 @@ def scan_folder_children(parent_path: str, access_token: str) -> List[Dict]:
         # ]
     """
     try:
-        service = _get_drive_service(access_token)
-        
-        # First, find the parent folder ID
-        parent_path = parent_path.strip('/')
-        path_parts = [p.strip() for p in parent_path.split('/') if p.strip()]
-        
-        parent_id = None
-        for folder_name in path_parts:
-            folder_id = _find_folder(service, folder_name, parent_id)
-            if not folder_id:
-                logger.warning(f"Parent folder not found: {parent_path}")
-                return []
-            parent_id = folder_id
-        
-        # Now scan children of this parent
-        query = f"mimeType='application/vnd.google-apps.folder' and trashed=false and '{parent_id}' in parents"
-        
-        results = service.files().list(
-            q=query,
-            spaces="drive",
-            fields="files(id, name)",
-            pageSize=100
-        ).execute()
-        
-        folders = results.get("files", [])
-        children = []
-        for folder in folders:
-            child_path = f"/{parent_path}/{folder['name']}"
-            children.append({
-                "id": folder["id"],
-                "name": folder["name"],
-                "path": child_path
-            })
-        
-        logger.info(f"  [CACHE] Found {len(children)} children in {parent_path}")
-        return children
-        
+        return _scan_folder_children_once(parent_path, access_token)
     except Exception as e:
         logger.warning(f"Failed to scan children of {parent_path}: {e}")
         return []
 
 
+def _scan_folder_tree(service, max_depth: int) -> Dict:
+    """
+    Batched BFS over the user's folder tree up to max_depth.
+
+    Returns the flat folder list plus the SoA index described in
+    scan_drive_folders' docstring.
+    """
+    all_folders = []
+
+    def _list_level(parents: List[Tuple[Optional[str], str]]) -> List[List[Dict]]:
+        """List child folders for every parent at this level.
+
+        Sibling queries go through the Drive batch endpoint (up to 100
+        sub-requests per HTTP round trip), so a level costs one round
+        trip instead of one per folder.
+        """
+        level_requests = []
+        for parent_id, _ in parents:
+            scope = "'root' in parents" if parent_id is None else f"'{parent_id}' in parents"
+            level_requests.append(service.files().list(
+                q=f"{_FOLDERS_QUERY} and {scope}",
+                spaces="drive",
+                fields="nextPageToken, files(id, name)",
+                pageSize=1000
+            ))
+
+        results: List[List[Dict]] = [[] for _ in level_requests]
+
+        # (index, request) pairs still awaiting a page; follow-up pages for
+        # very wide folders (>1000 children) re-enter the next batch round
+        pending = list(enumerate(level_requests))
+        while pending:
+            # Single request (root level, narrow trees): skip batch overhead
+            if len(pending) == 1:
+                index, request = pending[0]
+                response = request.execute()
+                responses = {index: response}
+            else:
+                responses: Dict[int, Dict] = {}
+
+                def _collect(request_id, response, exception):
+                    if exception is not None:
+                        raise exception
+                    responses[int(request_id)] = response
+
+                # Drive caps batches at 100 sub-requests
+                for start in range(0, len(pending), 100):
+                    batch = service.new_batch_http_request(callback=_collect)
+                    for index, request in pending[start:start + 100]:
+                        batch.add(request, request_id=str(index))
+                    batch.execute()
+
+            next_pending = []
+            for index, request in pending:
+                response = responses[index]
+                results[index].extend(response.get("files", []))
+                follow_up = service.files().list_next(request, response)
+                if follow_up is not None:
+                    next_pending.append((index, follow_up))
+            pending = next_pending
+
+        return results
+
+    # BFS level by level: (parent_id, parent_path), starting at root
+    frontier: List[Tuple[Optional[str], str]] = [(None, "")]
+    depth = 0
+    while frontier and depth <= max_depth:
+        next_frontier: List[Tuple[Optional[str], str]] = []
+        for (parent_id, parent_path), folders in zip(frontier, _list_level(frontier)):
+            for folder in folders:
+                # Intern names: "2024", "Invoices" etc. recur across users and
+                # depths, so cached trees share one string object per name
+                name = sys.intern(folder["name"])
+                folder_path = f"{parent_path}/{name}"
+                all_folders.append({
+                    "id": folder["id"],
+                    "name": name,
+                    "path": folder_path,
+                    "depth": depth
+                })
+                next_frontier.append((folder["id"], folder_path))
+        frontier = next_frontier
+        depth += 1
+
+    # Build the SoA index in one pass: parallel arrays plus an id -> index
+    # map, so callers get O(1) id lookups and cheap per-depth filters
+    # instead of rescanning the folder dicts.
+    ids = []
+    names = []
+    paths = []
+    depths = array.array("B")
+    by_id = {}
+    root_indices = []
+    for index, folder in enumerate(all_folders):
+        ids.append(folder["id"])
+        names.append(folder["name"])
+        paths.append(folder["path"])
+        depths.append(folder["depth"])
+        by_id[folder["id"]] = index
+        if folder["depth"] == 0:
+            root_indices.append(index)
+
+    return {
+        "folders": all_folders,
+        "paths": paths,
+        "ids": ids,
+        "names": names,
+        "depths": depths,
+        "by_id": by_id,
+        "root_indices": root_indices,
+    }
+
+
+@retry_on_429
 def scan_drive_folders(access_token: str, max_depth: int = 2, user_id: Optional[str] = None, use_cache: bool = True) -> Dict:
     """
     Scan user's Google Drive for existing folder structure up to specified depth.
@@ -296,7 +649,14 @@ def scan_drive_folders(access_token: str, max_depth: int = 2, user_id: Optional[
             'folders': [  # Flat list of all folders with complete paths
                 {'id': str, 'name': str, 'path': str, 'depth': int}
             ],
-            'paths': [str]  # List of complete folder paths for AI context
+            'paths': [str],  # List of complete folder paths for AI context
+            # SoA index (parallel to 'paths') for O(1) lookups without
+            # re-walking the folder dicts:
+            'ids': [str],
+            'names': [str],
+            'depths': array.array('B'),
+            'by_id': {folder_id: index},
+            'root_indices': [int]  # indices of depth-0 folders
         }
 
     Example:
@@ -312,81 +672,96 @@ def scan_drive_folders(access_token: str, max_depth: int = 2, user_id: Optional[
     Raises:
         DriveError: If scanning fails
     """
-    # Check cache if user_id provided and caching is enabled
+    # Check cache (keyed by user when known, else by access-token digest)
+    cache_id = _folder_cache_id(access_token, user_id)
     logger.info(f"  [CACHE] scan_drive_folders called: user_id={user_id}, use_cache={use_cache}")
-    
-    if use_cache and user_id:
-        logger.info(f"  [CACHE] Attempting cache lookup for user_id: {user_id}")
+
+    if use_cache and cache_id:
+        logger.info(f"  [CACHE] Attempting cache lookup for: {cache_id}")
         logger.info(f"  [CACHE] Current cache keys: {list(_folder_cache.keys())}")
-        cached_data = _get_cached_folders(user_id)
+        cached_data = _get_cached_folders(cache_id, max_depth)
         if cached_data:
             logger.info(f"  [CACHE] ✅ Cache HIT - returning cached data")
-            return {
-                "folders": cached_data["folders"],
-                "paths": cached_data["paths"]
-            }
-        else:
-            logger.info(f"  [CACHE] ❌ Cache MISS - will scan Drive API")
+            return {k: v for k, v in cached_data.items() if k not in _CACHE_META_KEYS}
+        scan_lock = _get_scan_lock((cache_id, max_depth))
     else:
-        logger.info(f"  [CACHE] Cache disabled or no user_id - will scan Drive API")
-    
-    try:
-        service = _get_drive_service(access_token)
-        all_folders = []
+        logger.info(f"  [CACHE] Cache disabled - will scan Drive API")
+        scan_lock = nullcontext()
+
+    with scan_lock:
+        if use_cache and cache_id:
+            # A concurrent request may have filled or revalidated the entry
+            # while we waited on the lock; otherwise one changes.list call can
+            # confirm nothing moved and give the entry a fresh TTL
+            cached_data = _get_cached_folders(cache_id, max_depth) or _revalidate_cached_folders(
+                _get_drive_service(access_token), cache_id, max_depth
+            )
+            if cached_data:
+                return {k: v for k, v in cached_data.items() if k not in _CACHE_META_KEYS}
+            logger.info(f"  [CACHE] ❌ Cache MISS - will scan Drive API")
 
-        def _scan_folders_recursive(parent_id: Optional[str], parent_path: str, current_depth: int):
-            """Recursively scan folders up to max_depth."""
-            if current_depth > max_depth:
-                return
+        try:
+            service = _get_drive_service(access_token)
+            result = _scan_folder_tree(service, max_depth)
 
-            # Build query for folders at this level
-            query = "mimeType='application/vnd.google-apps.folder' and trashed=false"
-            if parent_id is None:
-                query += " and 'root' in parents"
-            else:
-                query += f" and '{parent_id}' in parents"
+            # Store in cache when we have a cache identity and caching is
+            # enabled, along with a changes cursor for later revalidation
+            if use_cache and cache_id:
+                _set_cached_folders(
+                    cache_id, max_depth, result, _get_changes_page_token(service)
+                )
 
-            results = service.files().list(
-                q=query,
-                spaces="drive",
-                fields="files(id, name)",
-                pageSize=100
-            ).execute()
+            return result
 
-            folders = results.get("files", [])
-            for folder in folders:
-                folder_path = f"{parent_path}/{folder['name']}" if parent_path else f"/{folder['name']}"
-                all_folders.append({
-                    "id": folder["id"],
-                    "name": folder["name"],
-                    "path": folder_path,
-                    "depth": current_depth
-                })
+        except Exception as e:
+            raise DriveError(f"Failed to scan Drive folders: {e}") from e
 
-                # Recursively scan children
-                _scan_folders_recursive(folder["id"], folder_path, current_depth + 1)
 
-        # Start recursive scan from root
-        _scan_folders_recursive(None, "", 0)
+async def scan_drive_folders_async(
+    access_token: str,
+    max_depth: int = 2,
+    user_id: Optional[str] = None,
+    use_cache: bool = True,
+) -> Dict:
+    """Async wrapper for scan_drive_folders.
 
-        # Extract just the paths for AI context
-        paths = [folder["path"] for folder in all_folders]
+    The google-api-python-client is sync-only, so the blocking scan runs in a
+    worker thread while the event loop stays free to serve other requests.
+    """
+    return await asyncio.to_thread(
+        scan_drive_folders, access_token, max_depth, user_id, use_cache
+    )
 
-        result = {
-            "folders": all_folders,
-            "paths": paths
-        }
-        
-        # Store in cache if user_id provided and caching is enabled
-        if use_cache and user_id:
-            _set_cached_folders(user_id, result)
-        
-        return result
 
-    except Exception as e:
-        raise DriveError(f"Failed to scan Drive folders: {e}") from e
+async def scan_folder_children_async(parent_path: str, access_token: str) -> List[Dict]:
+    """Async wrapper for scan_folder_children (runs in a worker thread)."""
+    return await asyncio.to_thread(scan_folder_children, parent_path, access_token)
+
+
+async def scan_folder_children_many_async(
+    parent_paths: List[str],
+    access_token: str,
+    max_concurrency: int = 5,
+) -> List[List[Dict]]:
+    """
+    Scan children of several parent folders concurrently.
+
+    Latency is ~max of one scan instead of the sum; the semaphore bounds
+    fanout so a wide candidate list cannot trigger Drive 429s.
+
+    Returns:
+        Child-folder lists in the same order as parent_paths.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _gated(path: str) -> List[Dict]:
+        async with semaphore:
+            return await scan_folder_children_async(path, access_token)
 
+    return await asyncio.gather(*(_gated(path) for path in parent_paths))
 
+
+@retry_on_429
 def ensure_folder_path(folder_path: str, access_token: Optional[str] = None) -> Tuple[str, bool]:
     """
     Ensure a folder path exists in Google Drive, creating folders as needed.
@@ -403,23 +778,65 @@ def ensure_folder_path(folder_path: str, access_token: Optional[str] = None) ->
     Raises:
         DriveError: If folder creation fails
     """
-    try:
-        service = _get_drive_service(access_token)
+    # Split path into components
+    path_parts = [p.strip() for p in folder_path.split("/") if p.strip()]
+
+    if not path_parts:
+        raise DriveError("Empty folder path")
 
-        # Split path into components
-        path_parts = [p.strip() for p in folder_path.split("/") if p.strip()]
+    # Hot path: the leaf id was resolved recently for this credential, so no
+    # Drive round-trips at all. Entries expire after an hour; a folder deleted
+    # in Drive meanwhile surfaces as an upload error and the entry ages out.
+    cred_key = _credential_cache_key(access_token)
+    path_cache_key = (cred_key, "/".join(path_parts))
+    now = time.time()
+    with _path_cache_lock:
+        cached = _path_cache.get(path_cache_key)
+        if cached is not None:
+            expires_at, cached_folder_id = cached
+            if expires_at > now:
+                _path_cache.move_to_end(path_cache_key)
+                return cached_folder_id, False
+            del _path_cache[path_cache_key]
 
-        if not path_parts:
-            raise DriveError("Empty folder path")
+    try:
+        service = _get_drive_service(access_token)
 
         # Track if we created any new folders
         created_new_folder = False
 
-        # Traverse/create each folder in the path
-        parent_id = None
+        # Prefetch candidates for every segment in one files.list query, then
+        # resolve the chain locally via parents; only truly-missing segments
+        # cost a create round-trip (1 + misses instead of 1 per segment).
+        # Drive's query grammar has no `name in (...)`, so OR the name tests,
+        # and paginate: common names like "2024" can exceed a page.
+        name_clause = " or ".join(
+            f"name='{_escape_query_value(name)}'" for name in dict.fromkeys(path_parts)
+        )
+        candidates: Dict[str, List[Dict]] = {}
+        request = service.files().list(
+            q=f"{_FOLDERS_QUERY} and ({name_clause})",
+            spaces="drive",
+            fields="nextPageToken, files(id, name, parents)",
+            pageSize=1000,
+        )
+        while request is not None:
+            results = request.execute()
+            for folder in results.get("files", []):
+                candidates.setdefault(folder["name"], []).append(folder)
+            request = service.files().list_next(request, results)
+
+        # Traverse/create each folder in the path, anchored at My Drive root
+        parent_id = _get_root_folder_id(service, cred_key)
         for folder_name in path_parts:
-            # Check if folder exists
-            folder_id = _find_folder(service, folder_name, parent_id)
+            folder_id = next(
+                (
+                    candidate["id"]
+                    for candidate in candidates.get(folder_name, [])
+                    if parent_id in candidate.get("parents", [])
+                ),
+                None,
+            )
 
             if not folder_id:
                 # Create folder if it doesn't exist
@@ -429,14 +846,32 @@ def ensure_folder_path(folder_path: str, access_token: Optional[str] = None) ->
 
             parent_id = folder_id
 
+        # New folders invalidate any token-keyed scan cache for this client
+        if created_new_folder and access_token:
+            clear_folder_cache(_folder_cache_id(access_token, None))
+
+        with _path_cache_lock:
+            _path_cache[path_cache_key] = (now + _PATH_CACHE_TTL_SECONDS, parent_id)
+            _path_cache.move_to_end(path_cache_key)
+            while len(_path_cache) > _PATH_CACHE_MAXSIZE:
+                _path_cache.popitem(last=False)
+
         return parent_id, created_new_folder
 
     except Exception as e:
         raise DriveError(f"Failed to ensure folder path: {e}") from e
 
 
+async def ensure_folder_path_async(
+    folder_path: str, access_token: Optional[str] = None
+) -> Tuple[str, bool]:
+    """Async wrapper for ensure_folder_path (runs in a worker thread)."""
+    return await asyncio.to_thread(ensure_folder_path, folder_path, access_token)
+
+
+@retry_on_429
 def upload_file(
-    file_data_uri: str,
+    file_bytes: bytes,
     filename: str,
     folder_id: Optional[str] = None,
     mime_type: str = "image/jpeg",
@@ -446,7 +881,7 @@ def upload_file(
     Upload a file to Google Drive.
 
     Args:
-        file_data_uri: Base64-encoded file data URI
+        file_bytes: Raw file content (callers decode data URIs once, upstream)
         filename: Name for the file in Google Drive
         folder_id: ID of the folder to upload to (None for root)
         mime_type: MIME type of the file
@@ -458,31 +893,38 @@ def upload_file(
     Raises:
         DriveError: If upload fails
     """
+    # Dedupe: identical bytes headed for the same folder/filename were already
+    # uploaded, so skip the network entirely. sha256 over a few MB is
+    # negligible next to the Drive round-trip.
+    upload_key = (hashlib.sha256(file_bytes).digest(), folder_id, filename)
+    with _upload_cache_lock:
+        cached = _upload_cache.get(upload_key)
+        if cached is not None:
+            expires_at, file_id, web_view_link = cached
+            if expires_at > time.time():
+                _upload_cache.move_to_end(upload_key)
+                logger.info(f"Duplicate upload detected for {filename}; reusing Drive file")
+                return file_id, web_view_link
+            del _upload_cache[upload_key]
+
     try:
         service = _get_drive_service(access_token)
 
-        # Extract base64 data from data URI
-        if not file_data_uri.startswith("data:"):
-            raise DriveError("Invalid data URI format")
-
-        parts = file_data_uri.split(",", 1)
-        if len(parts) != 2:
-            raise DriveError("Invalid data URI: missing base64 data")
-
-        # Decode the base64 data
-        file_data = base64.b64decode(parts[1])
-        file_stream = io.BytesIO(file_data)
+        file_stream = io.BytesIO(file_bytes)
 
         # Prepare file metadata
         file_metadata = {"name": filename}
         if folder_id:
             file_metadata["parents"] = [folder_id]
 
-        # Upload the file
+        # Upload the file. Non-resumable avoids the extra session-initiation
+        # round trip a resumable upload pays; scanner PDFs are a few MB at
+        # most, so a single POST straight from the in-memory stream is fine.
         media = MediaIoBaseUpload(
             file_stream,
             mimetype=mime_type,
-            resumable=True
+            chunksize=1024 * 1024,
+            resumable=False
         )
 
         file = service.files().create(
@@ -494,7 +936,35 @@ def upload_file(
         file_id = file.get("id")
         web_view_link = file.get("webViewLink")
 
+        with _upload_cache_lock:
+            _upload_cache[upload_key] = (
+                time.time() + _UPLOAD_CACHE_TTL_SECONDS,
+                file_id,
+                web_view_link,
+            )
+            _upload_cache.move_to_end(upload_key)
+            while len(_upload_cache) > _UPLOAD_CACHE_MAXSIZE:
+                _upload_cache.popitem(last=False)
+
         return file_id, web_view_link
 
     except Exception as e:
         raise DriveError(f"Failed to upload file: {e}") from e
+
+
+async def upload_file_async(
+    file_bytes: bytes,
+    filename: str,
+    folder_id: Optional[str] = None,
+    mime_type: str = "image/jpeg",
+    access_token: Optional[str] = None
+) -> Tuple[str, str]:
+    """Async wrapper for upload_file (runs in a worker thread)."""
+    return await asyncio.to_thread(
+        upload_file,
+        file_bytes,
+        filename,
+        folder_id,
+        mime_type,
+        access_token,
+    )
@@ -2,7 +2,7 @@
 
 from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class FolderInfo(BaseModel):
@@ -17,8 +17,7 @@ class ProcessDocumentRequest(BaseModel):
     pdfData: str = Field(..., min_length=1, max_length=50000000)  # Base64 encoded PDF
     googleAccessToken: str = Field(..., min_length=1, max_length=2048)  # Required for Drive folder scanning
 
-    class Config:
-        extra = "forbid"
+    model_config = ConfigDict(extra="forbid")
 
 
 class ProcessDocumentResponse(BaseModel):
@@ -34,8 +33,25 @@ class ProcessDocumentResponse(BaseModel):
     pathReason: str  # Brief explanation of why this path was chosen
     isExistingPath: bool  # True if path exists in Drive, False if creating new
 
-    class Config:
-        extra = "forbid"
+    model_config = ConfigDict(extra="forbid")
+
+
+class ProcessDocumentJobResponse(BaseModel):
+    """Response model for submitting an async analysis job."""
+    jobId: str
+    status: str  # Always "pending" at submission time
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class JobStatusResponse(BaseModel):
+    """Response model for polling an async analysis job."""
+    jobId: str
+    status: str  # "pending" | "done" | "error"
+    result: Optional[ProcessDocumentResponse] = None  # Set when status == "done"
+    error: Optional[str] = None  # Set when status == "error"
+
+    model_config = ConfigDict(extra="forbid")
 
 
 class UploadDocumentRequest(BaseModel):
@@ -47,8 +63,7 @@ class UploadDocumentRequest(BaseModel):
     year: int = Field(..., ge=1900, le=2100)
     confirmedPath: str = Field(..., min_length=1, max_length=500)  # User-confirmed folder path
 
-    class Config:
-        extra = "forbid"
+    model_config = ConfigDict(extra="forbid")
 
 
 class UploadDocumentResponse(BaseModel):
@@ -57,5 +72,4 @@ class UploadDocumentResponse(BaseModel):
     driveUrl: Optional[str] = None
     finalFolderPath: Optional[str] = None
 
-    class Config:
-        extra = "forbid"
+    model_config = ConfigDict(extra="forbid")
@@ -5,11 +5,16 @@ This module uses Google's Gemini 2.5 Flash with Vision capabilities
 to analyze PDF documents and generate titles and categories.
 """
 
+import asyncio
+import hashlib
 import io
 import os
+import re
+import threading
 import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 import io
 
@@ -18,6 +23,13 @@ from pypdf import PdfReader, PdfWriter
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from retry import retry_on_429
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # pragma: no cover - orjson not installed
+    from json import loads as _json_loads
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -27,7 +39,127 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+# One model instance for the process: GenerativeModel is stateless per call,
+# so there is no reason to rebuild it (auth lookup, config) per request.
+_MODEL = genai.GenerativeModel('gemini-2.5-flash') if GEMINI_API_KEY else None
+
+# LRU+TTL cache of folder-context analyses keyed by (pdf sha256, folder-set
+# hash). Re-submitting the same PDF against an unchanged folder structure
+# (retries, back-navigation in the app) skips the Gemini call entirely.
+# Format: {(pdf_digest, folders_digest): (expires_at, result_dict)}
+_analysis_cache: "OrderedDict[Tuple[str, str], Tuple[float, Dict]]" = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+_ANALYSIS_CACHE_MAXSIZE = 256
+_ANALYSIS_CACHE_TTL_SECONDS = 3600  # 1 hour
+
+
+# Static prompt text hoisted to module constants and sent byte-identical on
+# every request: Gemini 2.5 applies implicit context caching to repeated
+# prompt prefixes, so keeping these stable (and putting per-request data like
+# the folder list AFTER them) lets repeat requests skip prefill and bill the
+# prefix at the cached rate.
+_PDF_PROMPT = """Analyze this PDF document and provide:
+1. A concise, descriptive title (max 80 characters) that captures the main purpose of the document
+2. A category from this list: invoices, receipts, contracts, insurance, tax, medical, school, id, personal, business, legal, financial, other
+3. The most relevant year for organizing this document (4-digit year, e.g., 2023)
+   - For invoices/receipts: use the document date
+   - For contracts: use the effective/start date
+   - For tax documents: use the tax year
+   - If no clear year exists, respond with "YEAR: null"
+
+Format your response as:
+TITLE: [your title here]
+CATEGORY: [category name in lowercase]
+YEAR: [4-digit year or null]"""
+
+_FOLDER_CONTEXT_PROMPT_PREFIX = """Analyze this PDF document and suggest the optimal storage location based on the user's existing folder structure (listed at the end of this message).
 
+YOUR TASKS:
+1. Generate a concise, descriptive title (max 80 characters) that captures the document's main purpose
+2. Determine the document category based on content AND the existing folder structure
+   - Review the folder paths below to understand how the user organizes documents
+   - Choose a category that aligns with their organizational patterns
+   - Categories can be flexible (e.g., if folders show 'Work', 'Business', 'Personal', use those)
+3. Extract the most relevant year for organizing this document (4-digit year)
+   - For invoices/receipts: use the document date
+   - For contracts: use the effective/start date
+   - For tax documents: use the tax year
+   - If no clear year exists, use null
+4. Select the BEST folder path from the existing folders OR suggest creating a new one
+   - Prioritize existing folders with semantic similarity to the document type
+   - Consider year-based organization (prefer 2025 folders for current documents)
+   - If no good match exists, suggest a new folder path that fits the user's organizational style
+5. Explain briefly why you chose this path
+
+RESPOND WITH A SINGLE JSON OBJECT:
+{"title": "your title here",
+ "category": "category name - flexible based on folders",
+ "year": 4-digit year or null,
+ "suggested_path": "full folder path like /Work/Resumes/2025",
+ "is_existing": true if the path exists in the list below else false,
+ "reasoning": "brief 1-sentence explanation of why this path fits"}
+
+IMPORTANT:
+- If suggesting an existing path, use the EXACT path from the list below (including leading /)
+- If suggesting a new path, follow the user's organizational patterns seen in existing folders
+- The category should align with the folder structure you see
+
+EXISTING FOLDERS IN GOOGLE DRIVE:
+"""
+
+
+# Compiled once: pulls every FIELD: value line out of a line-format Gemini
+# response in a single pass instead of split/strip/startswith per line
+# (process_pdf_with_gemini only; the folder-context call uses JSON mode)
+_FIELD_RE = re.compile(
+    r'^(TITLE|CATEGORY|YEAR):\s*(.*?)\s*$',
+    re.MULTILINE,
+)
+
+
+def _parse_year(year_str: Optional[str]) -> Optional[int]:
+    """Parse a YEAR field value; returns None for null/missing/garbage."""
+    if not year_str or year_str.lower() == 'null':
+        return None
+    try:
+        return int(year_str)
+    except ValueError:
+        logger.warning(f"Could not parse year from: {year_str}")
+        return None
+
+
+# Above this size, fall back to the Files API; below it, PDFs ride inline in
+# the generate_content request (the API caps inline requests at ~20 MB)
+_INLINE_PDF_LIMIT = 19_000_000
+
+
+def _pdf_part(pdf_bytes: bytes):
+    """
+    Build the PDF content part for generate_content.
+
+    Inline bytes skip the separate Files API upload round-trip entirely;
+    only oversized PDFs pay for genai.upload_file.
+    """
+    if len(pdf_bytes) <= _INLINE_PDF_LIMIT:
+        return {"mime_type": "application/pdf", "data": pdf_bytes}
+    logger.info(f"  [AI] PDF too large to inline ({len(pdf_bytes):,} bytes); using Files API")
+    return genai.upload_file(io.BytesIO(pdf_bytes), mime_type='application/pdf')
+
+
+def _analysis_cache_key(
+    pdf_bytes: bytes,
+    existing_folders: List[str],
+    pdf_digest: Optional[str] = None,
+) -> Tuple[str, str]:
+    if pdf_digest is None:
+        pdf_digest = hashlib.sha256(pdf_bytes).hexdigest()
+    folders_digest = hashlib.md5(
+        ",".join(sorted(existing_folders)).encode()
+    ).hexdigest()
+    return (pdf_digest, folders_digest)
+
+
+@retry_on_429
 def process_pdf_with_gemini(pdf_bytes: bytes) -> Dict[str, any]:
     """
     Use Gemini Vision to analyze a PDF document and generate title and category.
@@ -46,45 +178,22 @@ def process_pdf_with_gemini(pdf_bytes: bytes) -> Dict[str, any]:
 
     try:
         # Use Gemini 2.5 Flash model with vision (supports PDF)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-
-        prompt = """Analyze this PDF document and provide:
-1. A concise, descriptive title (max 80 characters) that captures the main purpose of the document
-2. A category from this list: invoices, receipts, contracts, insurance, tax, medical, school, id, personal, business, legal, financial, other
-3. The most relevant year for organizing this document (4-digit year, e.g., 2023)
-   - For invoices/receipts: use the document date
-   - For contracts: use the effective/start date
-   - For tax documents: use the tax year
-   - If no clear year exists, respond with "YEAR: null"
+        model = _MODEL
 
-Format your response as:
-TITLE: [your title here]
-CATEGORY: [category name in lowercase]
-YEAR: [4-digit year or null]"""
-
-        # Upload PDF to Gemini
-        pdf_file = genai.upload_file(io.BytesIO(pdf_bytes), mime_type='application/pdf')
-        
-        response = model.generate_content([prompt, pdf_file])
+        # Inline the PDF bytes (no separate Files API upload for typical sizes)
+        response = model.generate_content([_PDF_PROMPT, _pdf_part(pdf_bytes)])
 
         # Extract token usage from response
         input_tokens = 0
         output_tokens = 0
-        
-        print(f"[DEBUG] Response has usage_metadata: {hasattr(response, 'usage_metadata')}")
-        
+
         if hasattr(response, 'usage_metadata'):
             um = response.usage_metadata
-            print(f"[DEBUG] Raw usage_metadata object: {um}")
-            
-            # Access fields directly
             input_tokens = um.prompt_token_count
             output_tokens = um.candidates_token_count
-            
-            print(f"[DEBUG] Extracted input_tokens: {input_tokens}, output_tokens: {output_tokens}")
             logger.info(f"Token usage - Input: {input_tokens}, Output: {output_tokens}")
         else:
-            print("[DEBUG] No usage_metadata found on response!")
+            logger.debug("No usage_metadata found on response")
         
         # Calculate cost (Gemini 2.5 Flash pricing as of Nov 2024)
         # Input: $0.075 per 1M tokens, Output: $0.30 per 1M tokens
@@ -95,24 +204,10 @@ YEAR: [4-digit year or null]"""
         logger.info(f"Gemini Vision response: {response_text}")
         logger.info(f"Token usage - Input: {input_tokens}, Output: {output_tokens}, Cost: ${estimated_cost:.6f}")
 
-        title = None
-        category = None
-        year = None
-
-        for line in response_text.split('\n'):
-            line = line.strip()
-            if line.startswith('TITLE:'):
-                title = line.replace('TITLE:', '').strip()
-            elif line.startswith('CATEGORY:'):
-                category = line.replace('CATEGORY:', '').strip().lower()
-            elif line.startswith('YEAR:'):
-                year_str = line.replace('YEAR:', '').strip()
-                if year_str.lower() != 'null':
-                    try:
-                        year = int(year_str)
-                    except ValueError:
-                        logger.warning(f"Could not parse year from: {year_str}")
-                        year = None
+        fields = dict(_FIELD_RE.findall(response_text))
+        title = fields.get('TITLE')
+        category = fields.get('CATEGORY', '').lower() or None
+        year = _parse_year(fields.get('YEAR'))
 
         # Fallback if parsing fails
         if not title:
@@ -143,7 +238,64 @@ YEAR: [4-digit year or null]"""
         raise Exception(f"Failed to analyze PDF: {str(e)}")
 
 
-def analyze_pdf_with_folder_context(pdf_bytes: bytes, existing_folders: List[str]) -> Dict[str, any]:
+async def process_pdf_with_gemini_async(pdf_bytes: bytes) -> Dict[str, any]:
+    """Async wrapper for process_pdf_with_gemini.
+
+    The google-generativeai SDK is sync-only, so the blocking call runs in a
+    worker thread instead of pinning the event loop.
+    """
+    return await asyncio.to_thread(process_pdf_with_gemini, pdf_bytes)
+
+
+def prepare_pdf_for_analysis(pdf_bytes: bytes) -> bytes:
+    """
+    Reduce a PDF to its first page for AI analysis.
+
+    Gemini only needs page 1 for context, so multi-page PDFs are cut down to
+    save tokens/time. Returns the original bytes for single-page PDFs or if
+    pypdf fails.
+    """
+    extraction_start = time.perf_counter()
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        total_pages = len(reader.pages)
+
+        if total_pages > 1:
+            logger.info(f"  [AI] PDF has {total_pages} pages. Extracting first page for AI analysis.")
+            writer = PdfWriter()
+            writer.add_page(reader.pages[0])
+
+            output_stream = io.BytesIO()
+            writer.write(output_stream)
+            processed_pdf_bytes = output_stream.getvalue()
+            extraction_time = time.perf_counter() - extraction_start
+            logger.info(f"  [AI] Page extraction: {extraction_time:.3f}s")
+            logger.info(f"  [AI] Reduced PDF size from {len(pdf_bytes):,} to {len(processed_pdf_bytes):,} bytes ({len(processed_pdf_bytes)/len(pdf_bytes)*100:.1f}%)")
+            return processed_pdf_bytes
+
+        extraction_time = time.perf_counter() - extraction_start
+        logger.info(f"  [AI] PDF is single page ({extraction_time:.3f}s check)")
+        return pdf_bytes
+
+    except Exception as e:
+        extraction_time = time.perf_counter() - extraction_start
+        logger.warning(f"  [AI] Failed to extract first page ({extraction_time:.3f}s), falling back to full PDF: {e}")
+        # Fallback to full PDF if pypdf fails
+        return pdf_bytes
+
+
+async def prepare_pdf_for_analysis_async(pdf_bytes: bytes) -> bytes:
+    """Async wrapper for prepare_pdf_for_analysis (runs in a worker thread)."""
+    return await asyncio.to_thread(prepare_pdf_for_analysis, pdf_bytes)
+
+
+@retry_on_429
+def analyze_pdf_with_folder_context(
+    pdf_bytes: bytes,
+    existing_folders: List[str],
+    prepared_pdf_bytes: Optional[bytes] = None,
+    pdf_digest: Optional[str] = None,
+) -> Dict[str, any]:
     """
     Use Gemini Vision to analyze a PDF document with awareness of existing Drive folder structure.
 
@@ -153,6 +305,11 @@ def analyze_pdf_with_folder_context(pdf_bytes: bytes, existing_folders: List[str
     Args:
         pdf_bytes: PDF file content as bytes
         existing_folders: List of existing folder paths in user's Drive (e.g., ['/Work/Resumes/2025', '/Business/Invoices'])
+        prepared_pdf_bytes: Optional first-page-only PDF from
+            prepare_pdf_for_analysis, so callers can run the extraction
+            concurrently with other I/O (e.g. the Drive folder scan)
+        pdf_digest: Optional precomputed sha256 hexdigest of pdf_bytes
+            (callers that already hashed during decode avoid a re-hash here)
 
     Returns:
         A dict with:
@@ -170,93 +327,60 @@ def analyze_pdf_with_folder_context(pdf_bytes: bytes, existing_folders: List[str
     if not GEMINI_API_KEY:
         raise Exception("GEMINI_API_KEY environment variable is not set")
 
+    # Same PDF + same folder structure => same answer; skip Gemini on a hit
+    cache_key = _analysis_cache_key(pdf_bytes, existing_folders, pdf_digest)
+    now = time.time()
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(cache_key)
+        if cached is not None:
+            expires_at, cached_result = cached
+            if expires_at > now:
+                _analysis_cache.move_to_end(cache_key)
+                logger.info("  [AI] Analysis cache HIT - skipping Gemini call")
+                return dict(cached_result)
+            del _analysis_cache[cache_key]
+
     try:
         logger.info("  [AI] Starting analyze_pdf_with_folder_context")
         
         # Use Gemini 2.5 Flash model with vision (supports PDF)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = _MODEL
 
-        # OPTIMIZATION: Process only the first page to save tokens/time
-        # We still upload the full PDF later, but AI only sees page 1 for context
-        extraction_start = time.time()
-        processed_pdf_bytes = pdf_bytes
-        try:
-            reader = PdfReader(io.BytesIO(pdf_bytes))
-            total_pages = len(reader.pages)
-            
-            if total_pages > 1:
-                logger.info(f"  [AI] PDF has {total_pages} pages. Extracting first page for AI analysis.")
-                writer = PdfWriter()
-                writer.add_page(reader.pages[0])
-                
-                output_stream = io.BytesIO()
-                writer.write(output_stream)
-                processed_pdf_bytes = output_stream.getvalue()
-                extraction_time = time.time() - extraction_start
-                logger.info(f"  [AI] Page extraction: {extraction_time:.3f}s")
-                logger.info(f"  [AI] Reduced PDF size from {len(pdf_bytes):,} to {len(processed_pdf_bytes):,} bytes ({len(processed_pdf_bytes)/len(pdf_bytes)*100:.1f}%)")
-            else:
-                extraction_time = time.time() - extraction_start
-                logger.info(f"  [AI] PDF is single page ({extraction_time:.3f}s check)")
-                
-        except Exception as e:
-            extraction_time = time.time() - extraction_start
-            logger.warning(f"  [AI] Failed to extract first page ({extraction_time:.3f}s), falling back to full PDF: {e}")
-            # Fallback to full PDF if pypdf fails
-            processed_pdf_bytes = pdf_bytes
-
-        # Build folder list for prompt
-        folder_list = "\n".join(existing_folders) if existing_folders else "No existing folders found."
-
-        prompt = f"""Analyze this PDF document and suggest the optimal storage location based on the user's existing folder structure.
-
-EXISTING FOLDERS IN GOOGLE DRIVE:
-{folder_list}
-
-YOUR TASKS:
-1. Generate a concise, descriptive title (max 80 characters) that captures the document's main purpose
-2. Determine the document category based on content AND the existing folder structure
-   - Review the folder paths above to understand how the user organizes documents
-   - Choose a category that aligns with their organizational patterns
-   - Categories can be flexible (e.g., if folders show 'Work', 'Business', 'Personal', use those)
-3. Extract the most relevant year for organizing this document (4-digit year)
-   - For invoices/receipts: use the document date
-   - For contracts: use the effective/start date
-   - For tax documents: use the tax year
-   - If no clear year exists, use null
-4. Select the BEST folder path from the existing folders OR suggest creating a new one
-   - Prioritize existing folders with semantic similarity to the document type
-   - Consider year-based organization (prefer 2025 folders for current documents)
-   - If no good match exists, suggest a new folder path that fits the user's organizational style
-5. Explain briefly why you chose this path
-
-FORMAT YOUR RESPONSE EXACTLY AS:
-TITLE: [your title here]
-CATEGORY: [category name - flexible based on folders]
-YEAR: [4-digit year or null]
-SUGGESTED_PATH: [full folder path like /Work/Resumes/2025 or /Business/Invoices/2025]
-IS_EXISTING: [true if path exists in the list above, false if creating new]
-REASONING: [brief 1-sentence explanation of why this path fits]
+        # OPTIMIZATION: Process only the first page to save tokens/time.
+        # Callers may have already done this concurrently with other I/O.
+        if prepared_pdf_bytes is not None:
+            processed_pdf_bytes = prepared_pdf_bytes
+        else:
+            processed_pdf_bytes = prepare_pdf_for_analysis(pdf_bytes)
 
-IMPORTANT:
-- If suggesting an existing path, use the EXACT path from the list above (including leading /)
-- If suggesting a new path, follow the user's organizational patterns seen in existing folders
-- The category should align with the folder structure you see"""
-
-        # Upload PDF to Gemini (using the potentially reduced version)
-        upload_start = time.time()
-        pdf_file = genai.upload_file(io.BytesIO(processed_pdf_bytes), mime_type='application/pdf')
-        upload_time = time.time() - upload_start
-        logger.info(f"  [AI] Gemini file upload: {upload_time:.3f}s")
-
-        # Generate content with Gemini
-        generate_start = time.time()
-        response = model.generate_content([prompt, pdf_file])
-        generate_time = time.time() - generate_start
+        # Static prefix first, per-request folder list last, so the prefix
+        # stays byte-identical across requests for implicit context caching
+        folder_list = "\n".join(existing_folders) if existing_folders else "No existing folders found."
+        prompt = _FOLDER_CONTEXT_PROMPT_PREFIX + folder_list
+
+        # Build the PDF part (using the potentially reduced version); inline
+        # bytes make this free for typical sizes
+        upload_start = time.perf_counter()
+        pdf_file = _pdf_part(processed_pdf_bytes)
+        upload_time = time.perf_counter() - upload_start
+        logger.info(f"  [AI] Gemini PDF part prep: {upload_time:.3f}s")
+
+        # Generate content with Gemini (JSON mode: terse output, no brittle
+        # line-prefix parsing)
+        generate_start = time.perf_counter()
+        response = model.generate_content(
+            [prompt, pdf_file],
+            # No max_output_tokens: on 2.5 models thinking tokens count
+            # against the cap, so a tight limit truncates the response to
+            # zero content parts and response.text raises. JSON mode keeps
+            # the visible output terse on its own.
+            generation_config={"response_mime_type": "application/json"},
+        )
+        generate_time = time.perf_counter() - generate_start
         logger.info(f"  [AI] Gemini generate_content: {generate_time:.3f}s")
 
         # Extract token usage
-        parse_start = time.time()
+        parse_start = time.perf_counter()
         input_tokens = 0
         output_tokens = 0
 
@@ -264,7 +388,9 @@ IMPORTANT:
             um = response.usage_metadata
             input_tokens = um.prompt_token_count
             output_tokens = um.candidates_token_count
-            logger.info(f"  [AI] Token usage - Input: {input_tokens:,}, Output: {output_tokens:,}")
+            # Confirms whether the static prompt prefix hit Gemini's implicit cache
+            cached_tokens = getattr(um, 'cached_content_token_count', 0) or 0
+            logger.info(f"  [AI] Token usage - Input: {input_tokens:,}, Output: {output_tokens:,}, Cached: {cached_tokens:,}")
 
         # Calculate cost (Gemini 2.5 Flash pricing)
         # Input: $0.075 per 1M tokens, Output: $0.30 per 1M tokens
@@ -276,34 +402,24 @@ IMPORTANT:
         logger.info(f"  [AI] Response parsing...")
         logger.debug(f"  [AI] Gemini response: {response_text}")
 
-        title = None
-        category = None
-        year = None
-        suggested_path = None
-        is_existing_path = None
-        reasoning = None
-
-        for line in response_text.split('\n'):
-            line = line.strip()
-            if line.startswith('TITLE:'):
-                title = line.replace('TITLE:', '').strip()
-            elif line.startswith('CATEGORY:'):
-                category = line.replace('CATEGORY:', '').strip()
-            elif line.startswith('YEAR:'):
-                year_str = line.replace('YEAR:', '').strip()
-                if year_str.lower() != 'null':
-                    try:
-                        year = int(year_str)
-                    except ValueError:
-                        logger.warning(f"Could not parse year from: {year_str}")
-                        year = None
-            elif line.startswith('SUGGESTED_PATH:'):
-                suggested_path = line.replace('SUGGESTED_PATH:', '').strip()
-            elif line.startswith('IS_EXISTING:'):
-                is_existing_str = line.replace('IS_EXISTING:', '').strip().lower()
-                is_existing_path = is_existing_str == 'true'
-            elif line.startswith('REASONING:'):
-                reasoning = line.replace('REASONING:', '').strip()
+        # JSON mode guarantees a parseable object; guard anyway so a malformed
+        # response degrades to the fallback values instead of a 500
+        try:
+            fields = _json_loads(response_text)
+        except Exception:
+            logger.warning(f"Gemini returned non-JSON response: {response_text[:200]}")
+            fields = {}
+
+        title = fields.get('title')
+        category = fields.get('category')
+        year = fields.get('year')
+        if isinstance(year, str):
+            year = _parse_year(year)
+        suggested_path = fields.get('suggested_path')
+        is_existing_path = fields.get('is_existing')
+        if not isinstance(is_existing_path, bool):
+            is_existing_path = None
+        reasoning = fields.get('reasoning')
 
         # Fallback values
         if not title:
@@ -327,11 +443,11 @@ IMPORTANT:
         if len(title) > 80:
             title = title[:77] + "..."
 
-        parse_time = time.time() - parse_start
+        parse_time = time.perf_counter() - parse_start
         logger.info(f"  [AI] Response parsing complete: {parse_time:.3f}s")
         logger.info(f"  [AI] Result: title='{title}', category='{category}', year={year}, path='{suggested_path}'")
 
-        return {
+        result = {
             'title': title,
             'category': category,
             'year': year,
@@ -343,6 +459,33 @@ IMPORTANT:
             'estimated_cost': estimated_cost
         }
 
+        with _analysis_cache_lock:
+            _analysis_cache[cache_key] = (
+                time.time() + _ANALYSIS_CACHE_TTL_SECONDS,
+                dict(result),
+            )
+            _analysis_cache.move_to_end(cache_key)
+            while len(_analysis_cache) > _ANALYSIS_CACHE_MAXSIZE:
+                _analysis_cache.popitem(last=False)
+
+        return result
+
     except Exception as e:
         logger.error(f"Gemini Vision API call failed: {str(e)}")
         raise Exception(f"Failed to analyze PDF with folder context: {str(e)}")
+
+
+async def analyze_pdf_with_folder_context_async(
+    pdf_bytes: bytes,
+    existing_folders: List[str],
+    prepared_pdf_bytes: Optional[bytes] = None,
+    pdf_digest: Optional[str] = None,
+) -> Dict[str, any]:
+    """Async wrapper for analyze_pdf_with_folder_context (runs in a worker thread)."""
+    return await asyncio.to_thread(
+        analyze_pdf_with_folder_context,
+        pdf_bytes,
+        existing_folders,
+        prepared_pdf_bytes,
+        pdf_digest,
+    )
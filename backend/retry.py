@@ -0,0 +1,99 @@
+"""
+Retry helpers for rate-limited Google API calls.
+
+Gemini and Drive both signal throttling with HTTP 429 (Gemini via
+google.api_core ResourceExhausted). Instead of surfacing those as 500s,
+the decorator below honors the server-provided Retry-After header when
+present and otherwise backs off with decorrelated jitter.
+"""
+
+import functools
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+_MAX_ATTEMPTS = 5
+_MAX_SLEEP_SECONDS = 60.0
+_BASE_SLEEP_SECONDS = 1.0
+
+
+def _iter_exception_chain(exc):
+    """Yield exc and its causes (helpers wrap API errors in DriveError etc.)."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def _status_code(exc) -> int:
+    """Best-effort HTTP status extraction across Google client exception types."""
+    # googleapiclient.errors.HttpError keeps the httplib2 response on .resp
+    resp = getattr(exc, "resp", None)
+    if resp is not None:
+        try:
+            return int(resp.status)
+        except (TypeError, ValueError):
+            pass
+    # google.api_core exceptions (e.g. ResourceExhausted) expose .code
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return code
+    return 0
+
+
+def _is_rate_limited(exc) -> bool:
+    return any(_status_code(e) == 429 for e in _iter_exception_chain(exc))
+
+
+def _retry_after_seconds(exc):
+    """Pull a Retry-After value (seconds) out of the exception chain, if any."""
+    for e in _iter_exception_chain(exc):
+        resp = getattr(e, "resp", None)
+        if resp is None:
+            continue
+        # httplib2.Response is dict-like with lowercase header keys
+        try:
+            value = resp.get("retry-after")
+        except AttributeError:
+            value = None
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+
+def retry_on_429(func):
+    """
+    Retry a Google API call on HTTP 429, honoring Retry-After when provided.
+
+    Retries up to 5 times; without a Retry-After header the sleep uses
+    decorrelated jitter, capped at 60s. Non-429 errors propagate immediately.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        sleep = _BASE_SLEEP_SECONDS
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                return func(*args, **kwargs)
+            except Exception as exc:
+                if attempt == _MAX_ATTEMPTS or not _is_rate_limited(exc):
+                    raise
+                delay = _retry_after_seconds(exc)
+                if delay is None:
+                    # Decorrelated jitter backoff
+                    sleep = random.uniform(_BASE_SLEEP_SECONDS, sleep * 3)
+                    delay = sleep
+                delay = min(delay, _MAX_SLEEP_SECONDS)
+                logger.warning(
+                    f"Rate limited (429) in {func.__name__}, "
+                    f"attempt {attempt}/{_MAX_ATTEMPTS}; retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+    return wrapper
@@ -6,13 +6,22 @@ This script creates a sample PDF, converts it to base64, and sends it to the end
 """
 
 import base64
+import functools
 import requests
+from requests.adapters import HTTPAdapter
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 import io
 import json
 
+# Shared session with keep-alive so repeated runs/loops reuse the TCP
+# connection instead of paying a handshake per request.
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=20, pool_maxsize=50))
+SESSION.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=50))
 
+
+@functools.lru_cache(maxsize=1)
 def create_test_pdf() -> bytes:
     """Create a simple test PDF with sample invoice content."""
     buffer = io.BytesIO()
@@ -49,6 +58,7 @@ def create_test_pdf() -> bytes:
     return buffer.read()
 
 
+@functools.lru_cache(maxsize=1)
 def pdf_to_data_uri(pdf_bytes: bytes) -> str:
     """Convert PDF bytes to a base64 data URI."""
     base64_data = base64.b64encode(pdf_bytes).decode('utf-8')
@@ -79,7 +89,7 @@ def test_process_document():
         headers = {
             "Authorization": "Bearer test-token"
         }
-        response = requests.post(url, json=analyze_payload, headers=headers, timeout=120)
+        response = SESSION.post(url, json=analyze_payload, headers=headers, timeout=120)
 
         print(f"\nResponse status code: {response.status_code}")
 
@@ -99,7 +109,7 @@ def test_process_document():
             }
 
             print("\nSending upload request to /upload-document endpoint...")
-            upload_response = requests.post(
+            upload_response = SESSION.post(
                 "http://localhost:8000/upload-document",
                 json=upload_payload,
                 headers=headers,